@@ -1,7 +1,11 @@
-import requests
+import asyncio
+import aiohttp
+from aiolimiter import AsyncLimiter
+import orjson
 import time
 import logging
 import os
+import random
 import sys
 from dotenv import load_dotenv
 
@@ -11,10 +15,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Now we can import our modules
 try:
     # Try importing with the src prefix first (when running as a module)
-    from src.database import get_all_contracts, update_blockchain_metrics
+    from src.database import get_stale_contracts, bulk_update_blockchain_metrics
 except ModuleNotFoundError:
     # Fall back to direct imports (when running the script directly)
-    from database import get_all_contracts, update_blockchain_metrics
+    from database import get_stale_contracts, bulk_update_blockchain_metrics
 
 # Load environment variables
 load_dotenv()
@@ -28,17 +32,121 @@ logger = logging.getLogger(__name__)
 
 BSCSCAN_API_KEY = os.getenv("BSCSCAN_API_KEY")
 BSCSCAN_BASE_URL = "https://api.bscscan.com/api"
-REQUEST_DELAY = 0.25  # 250ms delay between requests to avoid rate limits
+MAX_CONCURRENT_REQUESTS = 64  # Contracts processed concurrently
+REQUESTS_PER_SECOND = 4.5  # ~90% of BscScan's 5 req/s limit to avoid burst overruns
+MAX_REQUEST_TRIES = 5
+RETRY_BASE_DELAY = 0.5  # Seconds; doubled on every retry
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Metrics younger than this are skipped; keep it below BSC_DATA_FETCH_INTERVAL so
+# contracts refreshed on one run are due again by the next
+METRICS_REFRESH_TTL = int(os.getenv("BSC_METRICS_REFRESH_TTL", "3000"))
+# Caps contracts, not requests: a contract costs two requests plus one per extra
+# page of 24h transfers, so busy contracts can make a run take much longer
+MAX_CONTRACTS_PER_RUN = int(os.getenv("BSC_MAX_CONTRACTS_PER_RUN", "1000"))
+TRANSFERS_PAGE_SIZE = 100  # Transfers requested per page when counting 24h activity
+TRANSFERS_MAX_PAGES = 10000 // TRANSFERS_PAGE_SIZE  # BscScan caps page * offset at 10,000
 
-def fetch_holders_count(contract_address):
+def _retry_delay(attempt, headers=None):
+    """
+    Compute how long to wait before retrying a BscScan request.
+
+    Uses exponential backoff with jitter, stretched to honour any Retry-After
+    or exhausted X-RateLimit-Remaining header the server sent back.
+    """
+    delay = RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, RETRY_BASE_DELAY)
+
+    if headers:
+        retry_after = headers.get('Retry-After')
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        elif headers.get('X-RateLimit-Remaining') == '0':
+            # BscScan limits are per second, so the window resets shortly
+            delay = max(delay, 1.0)
+
+    return delay
+
+def _is_rate_limited(data):
+    """Check whether a BscScan payload reports that we hit the rate limit."""
+    return data.get('message') == 'NOTOK' and 'rate limit' in str(data.get('result', '')).lower()
+
+async def _request_with_retry(session, limiter, params, max_tries=MAX_REQUEST_TRIES):
+    """
+    Query the BscScan API, retrying transient failures with exponential backoff.
+
+    Args:
+        session (aiohttp.ClientSession): The HTTP session to issue the request on.
+        limiter (AsyncLimiter): Rate limiter shared by all BscScan requests.
+        params (dict): Query parameters for the BscScan API.
+        max_tries (int): Maximum number of attempts before giving up.
+
+    Returns:
+        dict: The decoded JSON payload, or None if every attempt failed.
+    """
+    for attempt in range(max_tries):
+        headers = None
+        try:
+            async with limiter:
+                async with session.get(BSCSCAN_BASE_URL, params=params) as response:
+                    headers = response.headers
+                    if response.status in RETRYABLE_STATUSES:
+                        reason = f"HTTP {response.status}"
+                    else:
+                        response.raise_for_status()
+                        # orjson decodes large tokentx pages much faster than the stdlib
+                        data = orjson.loads(await response.read())
+                        if not _is_rate_limited(data):
+                            return data
+                        reason = data['result']
+        except aiohttp.ClientResponseError:
+            # Non-transient HTTP errors (e.g. 403) won't be fixed by retrying
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            reason = str(e) or type(e).__name__
+
+        if attempt + 1 < max_tries:
+            delay = _retry_delay(attempt, headers)
+            logger.warning(f"BscScan request failed ({reason}), retrying in {delay:.2f}s "
+                           f"(attempt {attempt + 1}/{max_tries})")
+            await asyncio.sleep(delay)
+        else:
+            logger.error(f"BscScan request failed ({reason}) after {max_tries} attempts")
+
+    return None
+
+def _count_newer_than(transactions, cutoff):
+    """
+    Count transactions with a timestamp after cutoff in a newest-first list.
+
+    The list is sorted, so a binary search finds the boundary while parsing
+    only O(log n) timestamps; a page that lies wholly inside the window costs
+    a single comparison of its last entry.
+    """
+    if not transactions or int(transactions[-1]['timeStamp']) > cutoff:
+        return len(transactions)
+
+    lo, hi = 0, len(transactions) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if int(transactions[mid]['timeStamp']) > cutoff:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+async def fetch_holders_count(session, limiter, contract_address):
     """
     Fetch the number of token holders for a contract.
 
     Args:
+        session (aiohttp.ClientSession): The HTTP session to issue the request on.
+        limiter (AsyncLimiter): Rate limiter shared by all BscScan requests.
         contract_address (str): The contract address to query.
 
     Returns:
-        int: The number of token holders, or 0 if the request fails.
+        int: The number of token holders, or None if the request fails.
     """
     try:
         # Unfortunately, BscScan API doesn't provide a direct endpoint for holder count
@@ -55,8 +163,10 @@ def fetch_holders_count(contract_address):
         }
 
         logger.info(f"Fetching holders for contract: {contract_address[:8]}...")
-        response = requests.get(BSCSCAN_BASE_URL, params=params, timeout=10)
-        data = response.json()
+        data = await _request_with_retry(session, limiter, params)
+
+        if data is None:
+            return None
 
         if data['status'] == '1':
             # If successful, return the total count if provided, or just the count of returned holders
@@ -70,21 +180,23 @@ def fetch_holders_count(contract_address):
             return holders_count
         else:
             logger.warning(f"Failed to get holders for {contract_address[:8]}: {data.get('message', 'Unknown error')}")
-            return 0
+            return None
 
     except Exception as e:
         logger.error(f"Error fetching holders for {contract_address[:8]}: {e}")
-        return 0
+        return None
 
-def fetch_transfers_24h(contract_address):
+async def fetch_transfers_24h(session, limiter, contract_address):
     """
     Fetch and count token transfers in the last 24 hours.
 
     Args:
+        session (aiohttp.ClientSession): The HTTP session to issue the request on.
+        limiter (AsyncLimiter): Rate limiter shared by all BscScan requests.
         contract_address (str): The contract address to query.
 
     Returns:
-        int: The number of transfers in the last 24 hours, or 0 if the request fails.
+        int: The number of transfers in the last 24 hours, or None if the request fails.
     """
     try:
         # Calculate timestamp for 24 hours ago
@@ -96,59 +208,116 @@ def fetch_transfers_24h(contract_address):
             'contractaddress': contract_address,
             'startblock': 0,
             'endblock': 99999999,
+            'page': 1,
+            'offset': TRANSFERS_PAGE_SIZE,
             'sort': 'desc',
             'apikey': BSCSCAN_API_KEY
         }
 
         logger.info(f"Fetching recent transfers for contract: {contract_address[:8]}...")
-        response = requests.get(BSCSCAN_BASE_URL, params=params, timeout=10)
-        data = response.json()
+        transfers_24h = 0
 
-        if data['status'] == '1':
-            # Count transfers in the last 24 hours
-            transfers_24h = sum(1 for tx in data['result'] if int(tx['timeStamp']) > timestamp_24h_ago)
-            logger.info(f"Contract {contract_address[:8]} has {transfers_24h} transfers in the last 24 hours")
-            return transfers_24h
+        # Results are newest first, so page through them until we reach a
+        # transfer older than 24 hours instead of downloading the full history
+        while params['page'] <= TRANSFERS_MAX_PAGES:
+            data = await _request_with_retry(session, limiter, params)
+
+            # A failure on any page means the count is incomplete, so report
+            # it as a failure rather than storing a partial count
+            if data is None:
+                return None
+
+            if data['status'] != '1':
+                # BscScan reports an exhausted history (or a token with no
+                # transfers at all) as status 0 with this message
+                if data.get('message') == 'No transactions found':
+                    break
+                logger.warning(f"Failed to get transfers for {contract_address[:8]}: {data.get('message', 'Unknown error')}")
+                return None
+
+            transactions = data['result']
+            recent = _count_newer_than(transactions, timestamp_24h_ago)
+            transfers_24h += recent
+
+            if recent < len(transactions) or len(transactions) < TRANSFERS_PAGE_SIZE:
+                break
+
+            if params['page'] == 1:
+                # Pin the range to the newest block seen so far; otherwise
+                # transfers landing between page requests shift the offsets
+                # and later pages repeat rows that were already counted
+                params['endblock'] = int(transactions[0]['blockNumber'])
+
+            params['page'] += 1
         else:
-            logger.warning(f"Failed to get transfers for {contract_address[:8]}: {data.get('message', 'Unknown error')}")
-            return 0
+            logger.warning(f"Transfer count for {contract_address[:8]} is truncated at "
+                           f"{TRANSFERS_MAX_PAGES * TRANSFERS_PAGE_SIZE} (BscScan pagination limit)")
+
+        logger.info(f"Contract {contract_address[:8]} has {transfers_24h} transfers in the last 24 hours")
+        return transfers_24h
 
     except Exception as e:
         logger.error(f"Error fetching transfers for {contract_address[:8]}: {e}")
-        return 0
+        return None
 
-def update_blockchain_data():
-    """Update blockchain data for all contracts in the database."""
+async def update_blockchain_data():
+    """Update blockchain data for contracts whose metrics are missing or stale."""
     logger.info("Starting blockchain data update...")
 
-    contracts = get_all_contracts()
+    # Prefetch the contracts that are due once on the shared connection, off the event loop
+    contracts = await asyncio.to_thread(get_stale_contracts, METRICS_REFRESH_TTL, MAX_CONTRACTS_PER_RUN)
 
     if not contracts:
-        logger.warning("No contracts found in the database. Skipping blockchain data update.")
+        logger.info("No contracts need a metrics refresh. Skipping blockchain data update.")
         return
 
     logger.info(f"Found {len(contracts)} contracts to update")
 
-    for contract in contracts:
-        try:
-            # Fetch data from BscScan
-            holders = fetch_holders_count(contract)
-            time.sleep(REQUEST_DELAY)  # Avoid rate limits
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    limiter = AsyncLimiter(REQUESTS_PER_SECOND, 1)
+    connector = aiohttp.TCPConnector(limit_per_host=MAX_CONCURRENT_REQUESTS)
+    timeout = aiohttp.ClientTimeout(total=10)
+
+    results = []
 
-            transfers = fetch_transfers_24h(contract)
-            time.sleep(REQUEST_DELAY)  # Avoid rate limits
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
 
-            # Update database
-            current_timestamp = int(time.time())
-            update_blockchain_metrics(contract, holders, transfers, current_timestamp)
+        async def process(contract):
+            async with semaphore:
+                try:
+                    # Fetch data from BscScan; the two queries are independent
+                    holders, transfers = await asyncio.gather(
+                        fetch_holders_count(session, limiter, contract),
+                        fetch_transfers_24h(session, limiter, contract),
+                    )
 
-            logger.info(f"Updated metrics for {contract[:8]}: {holders} holders, {transfers} recent transfers")
+                    # A failed query comes back as None and leaves that field's stored
+                    # value untouched. Rows where both failed are still written so
+                    # the attempt is recorded and the contract moves down the queue.
+                    current_timestamp = int(time.time())
+                    results.append((holders, transfers, current_timestamp, contract))
 
-        except Exception as e:
-            logger.error(f"Error updating blockchain data for {contract[:8]}: {e}")
-            continue
+                    if holders is None and transfers is None:
+                        logger.warning(f"Fetching metrics failed for {contract[:8]}; recording the attempt only")
+                        return
+
+                    logger.info(f"Fetched metrics for {contract[:8]}: {holders} holders, {transfers} recent transfers")
+
+                except Exception as e:
+                    logger.error(f"Error updating blockchain data for {contract[:8]}: {e}")
+
+        await asyncio.gather(*(process(contract) for contract in contracts))
+
+    # Write all metrics back in one transaction instead of one commit per contract
+    if results:
+        await asyncio.to_thread(bulk_update_blockchain_metrics, results)
+        logger.info(f"Recorded metrics for {len(results)} contracts")
 
     logger.info("Blockchain data update completed")
 
+def update_blockchain_data_sync():
+    """Synchronous entry point for schedulers that can't await coroutines."""
+    asyncio.run(update_blockchain_data())
+
 if __name__ == "__main__":
-    update_blockchain_data()
\ No newline at end of file
+    update_blockchain_data_sync()
\ No newline at end of file
@@ -1,5 +1,9 @@
 import sqlite3
 import os
+import string
+import threading
+import time
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,91 +14,320 @@ DATABASE_PATH = os.getenv("DATABASE_PATH", "data/memecoins.db")
 # Ensure the directory exists
 os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
 
+# A single connection shared by the scheduler and bot threads. Autocommit mode
+# (isolation_level=None) means writes manage their own BEGIN/COMMIT, and the
+# lock serialises access since sqlite3 connections aren't safe to use
+# concurrently from several threads.
+_conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, isolation_level=None)
+_conn.executescript('''
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA busy_timeout=30000;
+''')
+_lock = threading.RLock()
+
+# Recent search_coin results. Coin data only changes when the scraper or the
+# blockchain updater writes, and both clear the cache when they do.
+SEARCH_CACHE_TTL = 60  # seconds
+_search_cache = TTLCache(maxsize=1024, ttl=SEARCH_CACHE_TTL)
+_cache_lock = threading.Lock()
+_cache_generation = 0
+_MISSING = object()
+# SQLite's NOCASE and LIKE fold ASCII case only; cache keys must fold the same way
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def _invalidate_search_cache():
+    """Drop cached search results so freshly written data is visible immediately."""
+    global _cache_generation
+    with _cache_lock:
+        _search_cache.clear()
+        _cache_generation += 1
+
 def get_connection():
-    """Get a connection to the SQLite database."""
-    return sqlite3.connect(DATABASE_PATH)
+    """Get the shared connection to the SQLite database."""
+    return _conn
 
 def initialize_database():
-    """Create the database tables if they don't exist."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """Create the database tables if they don't exist, migrating older schemas."""
+    with _lock:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        # Tune the shared connection for many small writes alongside bot reads.
+        # WAL, synchronous=NORMAL and busy_timeout are already set on connect.
+        cursor.executescript('''
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-64000;
+        ''')
+
+        # Databases created before the metrics split keep everything in one
+        # coins table; move its metric columns over to coin_metrics first
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(coins)')}
+        if 'price' in columns:
+            _migrate_legacy_coins_table(cursor, columns)
+
+        # coin_metrics tables from before attempted_at existed need the column
+        metric_columns = {row[1] for row in cursor.execute('PRAGMA table_info(coin_metrics)')}
+        if metric_columns and 'attempted_at' not in metric_columns:
+            cursor.execute('ALTER TABLE coin_metrics ADD COLUMN attempted_at INTEGER')
 
-    # Create coins table
+        _create_tables(cursor)
+
+def _create_tables(cursor):
+    """Create the coin tables and their indexes if they don't exist."""
+    # Stable coin metadata, written only when the scraper sees a new or renamed coin
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS coins (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
         symbol TEXT NOT NULL,
-        contract TEXT UNIQUE NOT NULL,
+        contract TEXT UNIQUE NOT NULL
+    )
+    ''')
+
+    # Frequently rewritten metrics, kept in their own narrow rows so updates
+    # don't rewrite the metadata. metrics_updated tracks successful blockchain
+    # refreshes separately from last_updated, which the scraper also bumps;
+    # attempted_at records every refresh attempt, including failed ones.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS coin_metrics (
+        coin_id INTEGER PRIMARY KEY REFERENCES coins(id),
         price REAL,
         holders INTEGER,
         transfers_24h INTEGER,
-        last_updated INTEGER
+        last_updated INTEGER,
+        metrics_updated INTEGER,
+        attempted_at INTEGER
     )
     ''')
 
-    conn.commit()
-    conn.close()
+    # Case-insensitive indexes so exact name/symbol lookups avoid a table scan
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coins_symbol_nocase ON coins(symbol COLLATE NOCASE)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coins_name_nocase ON coins(name COLLATE NOCASE)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_coin_metrics_attempted_at ON coin_metrics(attempted_at)')
+    # Superseded by idx_coin_metrics_attempted_at for the stale-contract queue
+    cursor.execute('DROP INDEX IF EXISTS idx_coin_metrics_metrics_updated')
+
+def _migrate_legacy_coins_table(cursor, columns):
+    """
+    Split a legacy single-table coins schema into coins and coin_metrics.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the shared connection.
+        columns (set): Column names of the existing coins table.
+    """
+    metrics_updated = 'metrics_updated' if 'metrics_updated' in columns else 'NULL'
+
+    cursor.execute("BEGIN")
+    try:
+        # The legacy indexes follow the renamed table and keep their names, so
+        # the index creation here is skipped; initialize_database recreates
+        # them on the new tables once coins_legacy has been dropped
+        cursor.execute('ALTER TABLE coins RENAME TO coins_legacy')
+        _create_tables(cursor)
+        cursor.execute('''
+        INSERT INTO coins (id, name, symbol, contract)
+        SELECT id, name, symbol, contract FROM coins_legacy
+        ''')
+        cursor.execute(f'''
+        INSERT INTO coin_metrics (coin_id, price, holders, transfers_24h, last_updated, metrics_updated)
+        SELECT id, price, holders, transfers_24h, last_updated, {metrics_updated} FROM coins_legacy
+        ''')
+        cursor.execute('DROP TABLE coins_legacy')
+    except Exception:
+        cursor.connection.rollback()
+        raise
+
+    cursor.connection.commit()
 
 def update_coin_data(coins):
     """Update or insert coin data from the scraper."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with _lock:
+        conn = get_connection()
+        cursor = conn.cursor()
 
-    for coin in coins:
-        cursor.execute('''
-        INSERT INTO coins (name, symbol, contract, price, last_updated)
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(contract) DO UPDATE SET
-        name = excluded.name,
-        symbol = excluded.symbol,
-        price = excluded.price,
-        last_updated = excluded.last_updated
-        ''', (coin['name'], coin['symbol'], coin['contract'], coin['price'], coin['last_updated']))
-
-    conn.commit()
-    conn.close()
+        cursor.execute("BEGIN")
+        try:
+            cursor.executemany('''
+            INSERT INTO coins (name, symbol, contract)
+            VALUES (?, ?, ?)
+            ON CONFLICT(contract) DO UPDATE SET
+            name = excluded.name,
+            symbol = excluded.symbol
+            WHERE name != excluded.name OR symbol != excluded.symbol
+            ''', [(coin['name'], coin['symbol'], coin['contract']) for coin in coins])
+            cursor.executemany('''
+            INSERT INTO coin_metrics (coin_id, price, last_updated)
+            SELECT id, ?, ? FROM coins WHERE contract = ?
+            ON CONFLICT(coin_id) DO UPDATE SET
+            price = excluded.price,
+            last_updated = excluded.last_updated
+            ''', [(coin['price'], coin['last_updated'], coin['contract']) for coin in coins])
+        except Exception:
+            conn.rollback()
+            raise
+
+        conn.commit()
+
+    _invalidate_search_cache()
 
 def update_blockchain_metrics(contract, holders, transfers_24h, timestamp):
-    """Update blockchain metrics for a specific coin."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """
+    Update blockchain metrics for a specific coin.
 
-    cursor.execute('''
-    UPDATE coins SET
-    holders = ?,
-    transfers_24h = ?,
-    last_updated = ?
-    WHERE contract = ?
-    ''', (holders, transfers_24h, timestamp, contract))
+    A None holders or transfers_24h keeps the stored value for that field. The
+    attempt is always recorded, but the update timestamps only move when at
+    least one field was fetched.
+    """
+    with _lock:
+        conn = get_connection()
+        cursor = conn.cursor()
 
-    conn.commit()
-    conn.close()
+        cursor.execute('''
+        UPDATE coin_metrics SET
+        holders = COALESCE(?1, holders),
+        transfers_24h = COALESCE(?2, transfers_24h),
+        last_updated = CASE WHEN ?1 IS NULL AND ?2 IS NULL THEN last_updated ELSE ?3 END,
+        metrics_updated = CASE WHEN ?1 IS NULL AND ?2 IS NULL THEN metrics_updated ELSE ?3 END,
+        attempted_at = ?3
+        WHERE coin_id = (SELECT id FROM coins WHERE contract = ?4)
+        ''', (holders, transfers_24h, timestamp, contract))
+
+    _invalidate_search_cache()
+
+def bulk_update_blockchain_metrics(rows):
+    """
+    Update blockchain metrics for many coins in a single transaction.
+
+    Args:
+        rows (list): Tuples of (holders, transfers_24h, timestamp, contract). A None
+            holders or transfers_24h keeps the stored value for that field; a row
+            with both None only records the attempt.
+    """
+    with _lock:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("BEGIN")
+        try:
+            cursor.executemany('''
+            UPDATE coin_metrics SET
+            holders = COALESCE(?1, holders),
+            transfers_24h = COALESCE(?2, transfers_24h),
+            last_updated = CASE WHEN ?1 IS NULL AND ?2 IS NULL THEN last_updated ELSE ?3 END,
+            metrics_updated = CASE WHEN ?1 IS NULL AND ?2 IS NULL THEN metrics_updated ELSE ?3 END,
+            attempted_at = ?3
+            WHERE coin_id = (SELECT id FROM coins WHERE contract = ?4)
+            ''', rows)
+        except Exception:
+            conn.rollback()
+            raise
+
+        conn.commit()
+
+    _invalidate_search_cache()
 
 def get_all_contracts():
     """Get all contract addresses from the database."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with _lock:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT contract FROM coins')
+        return [row[0] for row in cursor.fetchall()]
+
+def get_stale_contracts(ttl_seconds, limit):
+    """
+    Get contracts whose blockchain metrics are missing or older than ttl_seconds.
+
+    Args:
+        ttl_seconds (int): How long fetched metrics stay fresh.
+        limit (int): Maximum number of contracts to return.
+
+    Returns:
+        list: Contract addresses, never-attempted and least recently attempted first.
+    """
+    cutoff = int(time.time()) - ttl_seconds
 
-    cursor.execute('SELECT contract FROM coins')
-    contracts = [row[0] for row in cursor.fetchall()]
+    with _lock:
+        conn = get_connection()
+        cursor = conn.cursor()
 
-    conn.close()
-    return contracts
+        # Ordering by the last attempt rather than the last success moves
+        # contracts that keep failing behind the rest of the queue instead of
+        # letting them take every slot. SQLite sorts NULLs first in ascending
+        # order, so never-attempted coins lead.
+        cursor.execute('''
+        SELECT c.contract
+        FROM coin_metrics m JOIN coins c ON c.id = m.coin_id
+        WHERE m.metrics_updated IS NULL OR m.metrics_updated < ?
+        ORDER BY m.attempted_at ASC
+        LIMIT ?
+        ''', (cutoff, limit))
+        return [row[0] for row in cursor.fetchall()]
 
 def search_coin(query):
-    """Search for a coin by name or symbol."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """
+    Search for a coin by name or symbol.
 
-    cursor.execute('''
-    SELECT name, symbol, contract, price, holders, transfers_24h, last_updated
-    FROM coins
-    WHERE name LIKE ? OR symbol LIKE ?
-    ''', (f'%{query}%', f'%{query}%'))
+    Results (including misses) are cached for SEARCH_CACHE_TTL seconds, keyed
+    on the normalised query.
+    """
+    key = query.strip().translate(_ASCII_LOWER)
+
+    with _cache_lock:
+        coin = _search_cache.get(key, _MISSING)
+        generation = _cache_generation
+    if coin is not _MISSING:
+        return coin
+
+    # Query with the stripped text as typed; the key only folds ASCII case, which
+    # SQLite ignores anyway, so results for one key are always the same
+    coin = _query_coin(query.strip())
+
+    with _cache_lock:
+        # Don't cache a result that a concurrent write has already made stale
+        if generation == _cache_generation:
+            _search_cache[key] = coin
+    return coin
+
+def _query_coin(query):
+    """
+    Look up a coin by name or symbol in the database.
+
+    Exact (case-insensitive) symbol and name matches are tried first since
+    they can use the indexes; the substring match is only a fallback.
+    """
+    columns = 'c.name, c.symbol, c.contract, m.price, m.holders, m.transfers_24h, m.last_updated'
+    source = 'coins c JOIN coin_metrics m ON m.coin_id = c.id'
+
+    with _lock:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+        SELECT {columns} FROM {source}
+        WHERE c.symbol = ? COLLATE NOCASE
+        LIMIT 1
+        ''', (query,))
+        result = cursor.fetchone()
+
+        if result is None:
+            cursor.execute(f'''
+            SELECT {columns} FROM {source}
+            WHERE c.name = ? COLLATE NOCASE
+            LIMIT 1
+            ''', (query,))
+            result = cursor.fetchone()
 
-    result = cursor.fetchone()
-    conn.close()
+        if result is None:
+            cursor.execute(f'''
+            SELECT {columns} FROM {source}
+            WHERE c.name LIKE ? OR c.symbol LIKE ?
+            LIMIT 1
+            ''', (f'%{query}%', f'%{query}%'))
+            result = cursor.fetchone()
 
     if result:
         return {
@@ -1,8 +1,6 @@
 import os
-import time
+import asyncio
 import logging
-import threading
-import schedule
 import sys
 import argparse
 from dotenv import load_dotenv
@@ -14,15 +12,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     # Try importing with the src prefix first (when running as a module)
     from src.database import initialize_database
-    from src.scraper import run_scraper
+    from src.scraper import run_scraper_async
     from src.blockchain import update_blockchain_data
-    from src.telegram_bot import run_bot
+    from src.telegram_bot import run_bot_async
 except ModuleNotFoundError:
     # Fall back to direct imports (when running the script directly)
     from database import initialize_database
-    from scraper import run_scraper
+    from scraper import run_scraper_async
     from blockchain import update_blockchain_data
-    from telegram_bot import run_bot
+    from telegram_bot import run_bot_async
 
 # Load environment variables
 load_dotenv()
@@ -38,27 +36,51 @@ logger = logging.getLogger(__name__)
 SCRAPE_INTERVAL = int(os.getenv("SCRAPE_INTERVAL", "3600"))  # Default: 1 hour
 BSC_DATA_FETCH_INTERVAL = int(os.getenv("BSC_DATA_FETCH_INTERVAL", "3600"))  # Default: 1 hour
 
-def scheduler_thread():
-    """Run scheduled tasks in a separate thread."""
-    logger.info("Starting scheduler thread...")
+async def run_safely(job):
+    """Await a scheduled job, logging instead of propagating any failure."""
+    try:
+        await job()
+    except Exception:
+        logger.exception(f"Scheduled job {job.__name__} failed")
 
-    # Schedule scraper to run periodically
-    schedule.every(SCRAPE_INTERVAL).seconds.do(run_scraper)
-    logger.info(f"Scheduled scraper to run every {SCRAPE_INTERVAL} seconds")
+async def periodic(job, interval):
+    """Run a job every `interval` seconds, starting after the first interval."""
+    while True:
+        await asyncio.sleep(interval)
+        await run_safely(job)
 
-    # Schedule blockchain data fetcher to run periodically
-    schedule.every(BSC_DATA_FETCH_INTERVAL).seconds.do(update_blockchain_data)
-    logger.info(f"Scheduled blockchain data fetcher to run every {BSC_DATA_FETCH_INTERVAL} seconds")
+async def run_scheduler():
+    """Collect data once at startup, then keep refreshing it on the event loop."""
+    logger.info("Starting scheduler...")
 
-    # Run the scraper and blockchain data fetcher once at startup
+    # Run the scraper and blockchain data fetcher once at startup, in order, so
+    # the fetcher sees the contracts the scraper just found
     logger.info("Running initial data collection...")
-    run_scraper()
-    update_blockchain_data()
+    await run_safely(run_scraper_async)
+    await run_safely(update_blockchain_data)
 
-    # Keep running the scheduled tasks
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    logger.info(f"Scheduled scraper to run every {SCRAPE_INTERVAL} seconds")
+    logger.info(f"Scheduled blockchain data fetcher to run every {BSC_DATA_FETCH_INTERVAL} seconds")
+    await asyncio.gather(
+        periodic(run_scraper_async, SCRAPE_INTERVAL),
+        periodic(update_blockchain_data, BSC_DATA_FETCH_INTERVAL),
+    )
+
+async def main_async(test_mode):
+    """Run the scheduler and the Telegram bot on a single event loop."""
+    scheduler = asyncio.create_task(run_scheduler())
+    logger.info("Scheduler started")
+
+    try:
+        # Start the Telegram bot, unless test mode is enabled
+        if not test_mode:
+            await run_bot_async()
+        else:
+            logger.info("Running in test mode, skipping bot initialization")
+            # Give the scheduler a moment to start initial data collection
+            await asyncio.sleep(1)
+    finally:
+        scheduler.cancel()
 
 def main():
     """Main entry point of the application."""
@@ -73,19 +95,10 @@ def main():
     initialize_database()
     logger.info("Database initialized")
 
-    # Start the scheduler in a separate thread
-    scheduler = threading.Thread(target=scheduler_thread)
-    scheduler.daemon = True  # This thread will exit when the main thread exits
-    scheduler.start()
-    logger.info("Scheduler thread started")
-
-    # Start the Telegram bot in the main thread, unless test mode is enabled
-    if not args.test:
-        run_bot()
-    else:
-        logger.info("Running in test mode, skipping bot initialization")
-        # Give the scheduler a moment to start initial data collection
-        time.sleep(1)
+    try:
+        asyncio.run(main_async(args.test))
+    except KeyboardInterrupt:
+        pass
 
     logger.info("Application shutting down...")
 
@@ -1,5 +1,9 @@
+import asyncio
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, Comment, SoupStrainer
+import re
 import time
 import logging
 import os
@@ -28,6 +32,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Reuse one session so repeated scrapes keep the connection to gra.fun alive
+# instead of paying for a fresh TCP + TLS handshake each time
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+# Coin cards and table rows are the only parts of the page the selectors look
+# at, so skip building the tree for everything else
+COIN_STRAINER = SoupStrainer(['div', 'tr'])
+# A standalone number, optionally '$'-prefixed. Numbers touching a letter, digit
+# (including subscripts), '.', ',' or '-' before them, or a letter, '.' or '%'
+# after them, are part of a larger token ('24h', '1.2K', '+5%', '1e-5', 'v2',
+# '$0.0₅1234') rather than a price
+PRICE_RE = re.compile(r'(\$\s*)?(?<![\w.,₀-₉-])(\d[\d,]*(?:\.\d+)?|\.\d+)(?![\w.%])')
+BSCSCAN_HREF_RE = re.compile(r'bscscan\.com')
+
+def _parse_price(price_text):
+    """Convert a displayed price such as '$1,234.56' to a float, or 0.0 if unparseable."""
+    matches = list(PRICE_RE.finditer(price_text))
+    if not matches:
+        return 0.0
+    # Prefer the dollar amount when the text also contains other numbers
+    match = next((m for m in matches if m.group(1)), matches[0])
+    return float(match.group(2).replace(',', ''))
+
+def _is_comment(text):
+    """Match HTML comment strings in find_all(string=...)."""
+    return isinstance(text, Comment)
+
+def _looks_like_coin_row(element):
+    """
+    Check whether a generic table row seems to hold coin data.
+
+    Matches rows with a link where 'contract' appears in the visible text, an
+    HTML comment, a tag name, or any attribute name or value (e.g. data-contract,
+    id="contract-...", href="/contract/0x..."). These are the places the old
+    check of the row's rendered HTML looked, without serialising every row
+    back to a string.
+    """
+    if not element.find('a'):
+        return False
+    if 'contract' in element.get_text(' ', strip=True).lower():
+        return True
+    # get_text() skips comments, which the rendered HTML included
+    for comment in element.find_all(string=_is_comment):
+        if 'contract' in comment.lower():
+            return True
+    for tag in [element, *element.find_all(True)]:
+        if 'contract' in tag.name.lower():
+            return True
+        for name, value in tag.attrs.items():
+            if isinstance(value, list):  # multi-valued attributes such as class
+                value = ' '.join(value)
+            if 'contract' in name.lower() or 'contract' in value.lower():
+                return True
+    return False
+
 def scrape_grafun():
     """
     Scrape meme coin data from gra.fun website.
@@ -46,10 +110,10 @@ def scrape_grafun():
         # Primary URL for BSC meme coins (this would need to be updated based on actual website structure)
         url = "https://gra.fun/coins"
 
-        response = requests.get(url, headers=headers, timeout=10)
+        response = _session.get(url, headers=headers, timeout=10)
         response.raise_for_status()  # Raise exception for 4XX/5XX status codes
 
-        soup = BeautifulSoup(response.text, 'lxml')
+        soup = BeautifulSoup(response.text, 'lxml', parse_only=COIN_STRAINER)
         coins = []
         current_timestamp = int(time.time())
 
@@ -71,7 +135,7 @@ def scrape_grafun():
             # Look for any table rows that might contain coin data
             coin_elements = soup.find_all('tr')
             # Filter out rows that don't seem to contain coin data
-            coin_elements = [e for e in coin_elements if e.find('a') and 'contract' in str(e).lower()]
+            coin_elements = [e for e in coin_elements if _looks_like_coin_row(e)]
 
         if not coin_elements:
             # If still unsuccessful, log the HTML for debugging
@@ -87,7 +151,7 @@ def scrape_grafun():
                 # The following extractions would need adjustment based on actual HTML structure
                 name_element = element.find('span', class_='coin-name') or element.find('td', class_='name')
                 symbol_element = element.find('span', class_='coin-symbol') or element.find('td', class_='symbol')
-                contract_element = element.find('a', href=lambda x: x and 'bscscan.com' in x) or element.find('td', class_='contract').find('a')
+                contract_element = element.find('a', href=BSCSCAN_HREF_RE) or element.find('td', class_='contract').find('a')
                 price_element = element.find('span', class_='coin-price') or element.find('td', class_='price')
 
                 # Extract values, handling potential missing elements
@@ -107,11 +171,7 @@ def scrape_grafun():
                     contract = "0x0000000000000000000000000000000000000000"  # Default
 
                 # For price, clean and convert to float
-                if price_element:
-                    price_text = price_element.text.strip().replace('$', '').replace(',', '')
-                    price = float(price_text) if price_text and price_text.replace('.', '').isdigit() else 0.0
-                else:
-                    price = 0.0
+                price = _parse_price(price_element.text) if price_element else 0.0
 
                 # Only include BSC tokens (those starting with 0x)
                 if contract.startswith('0x'):
@@ -149,5 +209,9 @@ def run_scraper():
 
     logger.info("Scraper run completed")
 
+async def run_scraper_async():
+    """Run the scraper in a worker thread so it doesn't block the event loop."""
+    await asyncio.to_thread(run_scraper)
+
 if __name__ == "__main__":
     run_scraper()
\ No newline at end of file
@@ -1,10 +1,12 @@
+import asyncio
+import functools
 import logging
 import os
 import sys
 import time
 from datetime import datetime
 from telegram import Update
-from telegram.ext import Updater, CommandHandler, CallbackContext
+from telegram.ext import Application, CommandHandler, ContextTypes
 from dotenv import load_dotenv
 
 # Add the parent directory to the path to make imports work from any directory
@@ -31,40 +33,40 @@ logger = logging.getLogger(__name__)
 # Get Telegram Bot Token from environment variables
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+@functools.lru_cache(maxsize=4096)
 def format_timestamp(timestamp):
     """Format unix timestamp to human-readable date/time."""
     if not timestamp:
         return "Never"
     return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
+@functools.lru_cache(maxsize=4096)
 def format_number(num):
     """Format number with commas for thousands separator."""
-    if num is None:
-        return "Unknown"
-    return f"{num:,}"
+    return "Unknown" if num is None else format(num, ",")
 
-def start(update: Update, context: CallbackContext) -> None:
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a welcome message when the command /start is issued."""
     user = update.effective_user
-    update.message.reply_text(
+    await update.message.reply_text(
         f"Hello {user.first_name}! Welcome to the Meme Coin Analysis Bot.\n\n"
         f"Use /analyze <coin_name> or /analyze <symbol> to get metrics for a specific coin.\n\n"
         f"Example: /analyze DOGE"
     )
 
-def help_command(update: Update, context: CallbackContext) -> None:
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a help message when the command /help is issued."""
-    update.message.reply_text(
+    await update.message.reply_text(
         "Meme Coin Analysis Bot Commands:\n\n"
         "/analyze <coin_name> - Get analysis for a specific coin\n"
         "/help - Show this help message\n"
         "/start - Start the bot"
     )
 
-def analyze_coin(update: Update, context: CallbackContext) -> None:
+async def analyze_coin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Analyze a coin by name or symbol."""
     if not context.args:
-        update.message.reply_text("Please provide a coin name or symbol.\nExample: /analyze DOGE")
+        await update.message.reply_text("Please provide a coin name or symbol.\nExample: /analyze DOGE")
         return
 
     query = ' '.join(context.args)
@@ -73,72 +75,106 @@ def analyze_coin(update: Update, context: CallbackContext) -> None:
     # Log the query for debugging
     logger.info(f"Searching for coin with query: {query}")
 
-    # Search for the coin in the database
-    coin = search_coin(query)
+    # Search for the coin in the database, off the event loop so other chats aren't held up
+    coin = await asyncio.to_thread(search_coin, query)
 
     if coin:
         # Format response
-        response = (
-            f"🪙 *{coin['name']}* ({coin['symbol']})\n\n"
-            f"💰 *Price:* ${coin['price']:.8f}\n"
-            f"👥 *Holders:* {format_number(coin['holders'])}\n"
-            f"📊 *Transfers (24h):* {format_number(coin['transfers_24h'])}\n\n"
-            f"📝 *Contract:* `{coin['contract']}`\n"
-            f"🕒 *Last Updated:* {format_timestamp(coin['last_updated'])}"
-        )
+        parts = [
+            f"🪙 *{coin['name']}* ({coin['symbol']})",
+            "",
+            f"💰 *Price:* ${coin['price']:.8f}",
+            f"👥 *Holders:* {format_number(coin['holders'])}",
+            f"📊 *Transfers (24h):* {format_number(coin['transfers_24h'])}",
+            "",
+            f"📝 *Contract:* `{coin['contract']}`",
+            f"🕒 *Last Updated:* {format_timestamp(coin['last_updated'])}",
+        ]
 
         # Add notes/analysis section
-        if coin['holders'] and coin['transfers_24h']:
-            activity_ratio = coin['transfers_24h'] / coin['holders'] if coin['holders'] > 0 else 0
-            response += f"\n\n📈 *Activity Ratio:* {activity_ratio:.4f} transfers per holder in 24h"
+        holders = coin['holders']
+        transfers_24h = coin['transfers_24h']
+        if holders and transfers_24h and holders > 0:
+            activity_ratio = transfers_24h / holders
+            parts.append("")
+            parts.append(f"📈 *Activity Ratio:* {activity_ratio:.4f} transfers per holder in 24h")
 
             # Add simple analysis
             if activity_ratio > 0.5:
-                response += "\n⚠️ *High activity ratio* - Could indicate significant trading or distribution"
+                parts.append("⚠️ *High activity ratio* - Could indicate significant trading or distribution")
             elif activity_ratio < 0.05:
-                response += "\n⚠️ *Low activity ratio* - May suggest low trading interest"
+                parts.append("⚠️ *Low activity ratio* - May suggest low trading interest")
 
         # Send response with Markdown formatting
-        update.message.reply_text(response, parse_mode='Markdown')
+        await update.message.reply_text("\n".join(parts), parse_mode='Markdown')
         logger.info(f"Sent analysis for {coin['name']} to user {update.effective_user.id}")
     else:
-        update.message.reply_text(f"Could not find a coin matching '{query}'. Try a different name or symbol.")
+        await update.message.reply_text(f"Could not find a coin matching '{query}'. Try a different name or symbol.")
         logger.info(f"No coin found for query: {query}")
 
-def error_handler(update: Update, context: CallbackContext) -> None:
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log errors caused by updates."""
     logger.error(f"Error occurred: {context.error} for update {update}")
 
     # Notify user about the error
-    if update and update.effective_message:
-        update.effective_message.reply_text("Sorry, an error occurred while processing your request.")
+    if isinstance(update, Update) and update.effective_message:
+        await update.effective_message.reply_text("Sorry, an error occurred while processing your request.")
 
-def run_bot():
-    """Start the Telegram bot."""
+def build_application():
+    """Create the Telegram application with all handlers registered, or None without a token."""
     if not TELEGRAM_BOT_TOKEN:
         logger.error("Telegram bot token not found in environment variables!")
-        return
-
-    logger.info("Starting Telegram bot...")
+        return None
 
-    # Create the Updater and dispatcher
-    updater = Updater(TELEGRAM_BOT_TOKEN)
-    dispatcher = updater.dispatcher
+    # Create the Application
+    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
 
     # Register command handlers
-    dispatcher.add_handler(CommandHandler("start", start))
-    dispatcher.add_handler(CommandHandler("help", help_command))
-    dispatcher.add_handler(CommandHandler("analyze", analyze_coin))
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("analyze", analyze_coin))
 
     # Register error handler
-    dispatcher.add_error_handler(error_handler)
+    application.add_error_handler(error_handler)
 
-    # Start the Bot
-    updater.start_polling()
+    return application
+
+def run_bot():
+    """Start the Telegram bot."""
+    logger.info("Starting Telegram bot...")
+
+    application = build_application()
+    if application is None:
+        return
+
+    # Start the Bot and run it until the user presses Ctrl-C
     logger.info("Bot started successfully")
+    application.run_polling()
+
+async def run_bot_async():
+    """
+    Run the Telegram bot on the current event loop until cancelled.
+
+    Unlike run_bot, this doesn't own the event loop, so other tasks such as
+    the data collection scheduler can share it.
+    """
+    logger.info("Starting Telegram bot...")
+
+    application = build_application()
+    if application is None:
+        return
 
-    # Run the bot until the user presses Ctrl-C
-    updater.idle()
+    async with application:
+        await application.start()
+        await application.updater.start_polling()
+        logger.info("Bot started successfully")
+
+        try:
+            # Serve updates until the surrounding task is cancelled (e.g. Ctrl-C)
+            await asyncio.Event().wait()
+        finally:
+            await application.updater.stop()
+            await application.stop()
 
 if __name__ == "__main__":
     run_bot()
\ No newline at end of file
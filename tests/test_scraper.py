@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+
+# Keep the database module from creating data/memecoins.db in the working tree
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(), "memecoins.db"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from bs4 import BeautifulSoup
+
+from src.scraper import _looks_like_coin_row, _parse_price
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$1,234.56", 1234.56),
+    ("0.00001234", 0.00001234),
+    ("$ 2.50", 2.5),
+    ("$.5", 0.5),
+    ("1,234.56 USD", 1234.56),
+    ("$0.0012 +5%", 0.0012),
+    ("24h: $3.10", 3.10),
+])
+def test_parse_price_extracts_standalone_number(text, expected):
+    assert _parse_price(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text", [
+    "$1.2K",
+    "$0.0₅1234",
+    "0.000₄12",
+    "1e-5",
+    "v2 token",
+    "N/A",
+    "",
+])
+def test_parse_price_rejects_numbers_inside_larger_tokens(text):
+    assert _parse_price(text) == 0.0
+
+
+@pytest.mark.parametrize("row_html", [
+    '<tr><td><a href="#">x</a> Contract</td></tr>',
+    '<tr><td><a href="#">x</a><!-- contract address --></td></tr>',
+    '<tr data-contract="0x1"><td><a href="#">x</a></td></tr>',
+    '<tr><td id="contract-1"><a href="#">x</a></td></tr>',
+    '<tr><td><a href="/contract/0x1">x</a></td></tr>',
+    '<tr><td class="token-contract"><a href="#">x</a></td></tr>',
+])
+def test_looks_like_coin_row_matches_contract_anywhere_in_row(row_html):
+    row = BeautifulSoup(row_html, 'lxml').find('tr')
+    assert _looks_like_coin_row(row)
+    assert 'contract' in str(row).lower()
+
+
+@pytest.mark.parametrize("row_html", [
+    '<tr><td>contract</td></tr>',
+    '<tr><td><a href="https://bscscan.com/token/0x1">x</a></td></tr>',
+])
+def test_looks_like_coin_row_rejects_rows_the_old_filter_rejected(row_html):
+    row = BeautifulSoup(row_html, 'lxml').find('tr')
+    assert not _looks_like_coin_row(row)
+    assert not (row.find('a') and 'contract' in str(row).lower())